@@ -14,8 +14,11 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 utils_dir = os.path.abspath(os.path.join(current_dir, "../utils"))
 sys.path.append(utils_dir)
+root_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(root_dir)
 from Gpt_generator import Gpt_generator
 from generate_map import generate_map
+from utils.processamento import carregar_processados
 
 gpt_generator = Gpt_generator()
 
@@ -66,22 +69,7 @@ def load_data():
     Carrega os dados processados salvos na pasta 'data/processed'.
     :return: Um dicionário com os dados carregados.
     """
-    data = {}
-
-    # Ler arquivos JSON
-    for json_file in ["passos.json", "distancia_total.json", "movimentos_descendentes.json", "tempo_movimento.json", "tempo_comendo.json"]:
-        path = os.path.join(processed_path, json_file)
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                data[json_file] = json.load(f)
-    
-    # Ler arquivos CSV
-    for csv_file in ["distancia_por_tempo.csv", "posicao_tempo.csv"]:
-        path = os.path.join(processed_path, csv_file)
-        if os.path.exists(path):
-            data[csv_file] = pd.read_csv(path)
-    
-    return data
+    return carregar_processados(processed_path)
 
 
 def logo_to_base64(image):
@@ -256,8 +244,15 @@ def main():
             df_posicao = data["posicao_tempo.csv"]
             df = df_posicao.drop(columns=["UTC_Time"]).rename(columns={"Latitude": "lat", "Longitude": "lng"})
             print(df)
+
+            # Sobreposição do mapa de calor, pré-calculada no processamento
+            camada = st.radio("Mapa de calor:", ["Nenhum", "Animal", "Rebanho"], horizontal=True)
+            mapa_calor = None
+            if camada != "Nenhum" and data.get("mapa_calor.json"):
+                mapa_calor = data["mapa_calor.json"].get("animal" if camada == "Animal" else "rebanho")
+
             # Gerando o mapa interativo em HTML
-            generate_map(df)
+            generate_map(df, mapa_calor=mapa_calor)
 
             # Exibindo o mapa interativo gerado
             st.components.v1.html(open("mapa_interativo.html", "r").read(), height=600, scrolling=True)
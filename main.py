@@ -1,11 +1,14 @@
 import subprocess
+import sys
 
 from utils.processamento import Processamento
 
 def main():
     """
     Executa o processamento dos dados e inicia a interface do Streamlit.
+    Com '--watch', mantém o monitor de 'data/raw' ativo enquanto a interface roda.
     """
+    monitor = None
     print("Iniciando o processamento dos dados...")
     
     try:
@@ -14,11 +17,22 @@ def main():
         processador.process()
         print("Processamento concluído com sucesso!")
 
+        if "--watch" in sys.argv:
+            from utils.historico import HistoricoBruto
+            from utils.monitoramento import MonitorPipeline
+
+            monitor = MonitorPipeline(historico=HistoricoBruto())
+            monitor.iniciar(varredura_inicial=False, intervalo_metricas_s=30)
+            print("Monitorando data/raw para novos dados...")
+
         # Iniciar a interface Streamlit
         print("Iniciando a interface...")
         subprocess.run(["streamlit", "run", "interface/app.py"])
     except Exception as e:
         print(f"Ocorreu um erro durante o processamento ou execução da interface: {e}")
+    finally:
+        if monitor is not None:
+            monitor.parar()
 
 if __name__ == "__main__":
     """_summary_
@@ -42,6 +42,20 @@ class Acelerometro:
             raise ValueError(f"O conjunto de dados deve conter as colunas {required_columns}.")
 
 
+    def load_intervalo(self, historico, coleira, inicio=None, fim=None):
+        """
+        Carrega os dados do acelerômetro de uma coleira a partir do histórico bruto.
+        :param historico: Instância de HistoricoBruto.
+        :param coleira: Identificador da coleira.
+        :param inicio: Instante inicial, inclusivo (ms desde a época, datetime ou texto ISO; UTC). None para sem limite.
+        :param fim: Instante final, inclusivo. None para sem limite.
+        """
+        data = historico.ler_intervalo(coleira, "acelerometro", inicio, fim)
+        if data.empty:
+            raise ValueError(f"Nenhum dado de acelerômetro para a coleira {coleira} no intervalo informado.")
+        self.load_data(data=data)
+
+
     def calculate_magnitude(self):
         if self.data is None:
             raise ValueError("Nenhum dado carregado. Use 'load_data()' para carregar os dados.")
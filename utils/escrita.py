@@ -0,0 +1,127 @@
+import os
+import json
+import shutil
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+geracoes_dir = "geracoes"
+ponteiro_geracao = "ATUAL"
+
+# Publicadores no mesmo diretório compartilham um lock, seja qual for a instância
+_locks_saida = {}
+_lock_registro = threading.Lock()
+
+
+def _lock_saida(path):
+    with _lock_registro:
+        return _locks_saida.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def serializar(filepath, data):
+    """
+    Salva um resultado em arquivo, de acordo com a extensão.
+    :param filepath: Caminho do arquivo (com extensão .csv ou .json).
+    :param data: Dados a serem salvos. Pode ser um DataFrame ou dicionário.
+    """
+    filename = os.path.basename(filepath)
+
+    if filename.endswith(".csv") and isinstance(data, pd.DataFrame):
+        data.to_csv(filepath, index=False)
+    elif filename.endswith(".json") and isinstance(data, dict):
+        # Converter valores para tipos JSON serializáveis
+        serializable_data = {
+            k: (v.item() if isinstance(v, (np.int64, np.float64)) else v)
+            for k, v in data.items()
+        }
+        # Sem indentação nem espaços: os arquivos são lidos pelo dashboard, não por pessoas
+        with open(filepath, "w") as f:
+            json.dump(serializable_data, f, separators=(",", ":"))
+    else:
+        raise ValueError(f"Formato de arquivo ou tipo de dados não suportado para {filename}")
+
+
+def geracao_atual(path):
+    """
+    Lê o identificador da geração publicada mais recentemente.
+    :param path: Diretório base dos dados processados.
+    :return: Identificador da geração, ou None se nenhuma foi publicada.
+    """
+    try:
+        with open(os.path.join(path, ponteiro_geracao), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def caminho_geracao(path, geracao):
+    """
+    Diretório onde estão os arquivos de uma geração.
+    """
+    return os.path.join(path, geracoes_dir, geracao)
+
+
+class EscritorGeracoes:
+    def __init__(self, output_path, workers=4, manter=3):
+        """
+        Publica todos os resultados de uma execução como uma geração imutável.
+        Os arquivos são serializados em paralelo num diretório temporário, que é renomeado
+        e só então apontado pelo arquivo 'ATUAL', trocado de forma atômica.
+        :param output_path: Diretório base dos dados processados.
+        :param workers: Número de threads usadas na serialização.
+        :param manter: Número de gerações antigas mantidas para leitores ainda em andamento.
+        """
+        self.output_path = output_path
+        self.workers = workers
+        self.manter = manter
+
+    def publicar(self, saidas):
+        """
+        Serializa e publica um conjunto de resultados.
+        :param saidas: Dicionário {nome do arquivo: dados}.
+        :return: Identificador da geração publicada.
+        """
+        geracao = f"{time.time_ns():020d}"
+        base = os.path.join(self.output_path, geracoes_dir)
+        temporario = os.path.join(base, f".tmp-{geracao}")
+        os.makedirs(temporario, exist_ok=True)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futuros = [
+                    executor.submit(serializar, os.path.join(temporario, filename), data)
+                    for filename, data in saidas.items()
+                ]
+                for futuro in futuros:
+                    futuro.result()
+        except Exception:
+            shutil.rmtree(temporario, ignore_errors=True)
+            raise
+
+        with _lock_saida(self.output_path):
+            os.replace(temporario, caminho_geracao(self.output_path, geracao))
+
+            # Uma execução que termina depois de outra mais nova não faz o ponteiro voltar
+            atual = geracao_atual(self.output_path)
+            if atual is None or geracao > atual:
+                ponteiro = os.path.join(self.output_path, ponteiro_geracao)
+                with open(ponteiro + ".tmp", "w") as f:
+                    f.write(geracao)
+                os.replace(ponteiro + ".tmp", ponteiro)
+                atual = geracao
+
+            self._limpar(atual)
+
+        return geracao
+
+    def _limpar(self, atual):
+        antigas = sorted(
+            nome for nome in os.listdir(os.path.join(self.output_path, geracoes_dir))
+            if not nome.startswith(".") and nome < atual
+        )
+        for nome in antigas[:max(len(antigas) - self.manter, 0)]:
+            shutil.rmtree(caminho_geracao(self.output_path, nome), ignore_errors=True)
@@ -1,10 +1,18 @@
+import json
 import pandas as pd
 import requests
 from urllib.parse import urlencode
 
-def generate_map(df):
+def generate_map(df, mapa_calor=None):
+    """
+    Gera o mapa interativo com a trajetória e, opcionalmente, a sobreposição do mapa de calor.
+    :param df: DataFrame com as colunas 'lat' e 'lng'.
+    :param mapa_calor: Payload de MapaCalor.payload() (grade de células com peso de 0 a 1), ou None.
+    """
     # Gerar os marcadores em formato JSON
     markers = df.to_dict(orient='records')
+    celulas = json.dumps(mapa_calor["celulas"] if mapa_calor else [])
+    tamanho = mapa_calor["tamanho_graus"] if mapa_calor else 0
 
     with open('mapa_interativo.html', 'w') as f:
         f.write(f"""
@@ -41,6 +49,20 @@ def generate_map(df):
                         radius: 1             // Raio em metros (simula um pequeno ponto)
                     }});
                 }});
+
+                // Mapa de calor: células [lat, lng, peso] a partir do canto inferior esquerdo
+                const celulas = {celulas};
+                const tamanho = {tamanho};
+                celulas.forEach(([lat, lng, peso]) => {{
+                    new google.maps.Rectangle({{
+                        strokeWeight: 0,
+                        fillColor: '#ff0000',
+                        fillOpacity: 0.1 + 0.6 * peso,
+                        map: map,
+                        clickable: false,
+                        bounds: {{ south: lat, west: lng, north: lat + tamanho, east: lng + tamanho }}
+                    }});
+                }});
             }}
         </script>
     </head>
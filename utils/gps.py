@@ -2,6 +2,35 @@ from math import radians, cos, sin, sqrt, atan2
 import pandas as pd
 import numpy as np
 
+def instante_utc(data):
+    """
+    Converte 'Date' (ddmmaa) e 'UTC_Time' de cada linha de GPS em ms desde a época Unix (UTC).
+    :return: Série com o instante em ms; NaN nas linhas sem data ou hora válidas.
+    """
+    data_gps = data["Date"].astype(str).str.split(".").str[0].str.zfill(6)
+    utc = pd.to_datetime(data_gps + " " + data["UTC_Time"].astype(str),
+                         format="%d%m%y %H:%M:%S", utc=True, errors="coerce")
+    return (utc - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(milliseconds=1)
+
+
+def timestamp_absoluto(data):
+    """
+    Calcula o instante absoluto (ms desde a época Unix, UTC) de cada linha de GPS.
+    'Time(ms)' é o tempo desde que a coleira ligou; ele é ancorado ao relógio do GPS
+    ('Date' no formato ddmmaa e 'UTC_Time') separadamente em cada sessão, isto é,
+    a cada vez que 'Time(ms)' volta para trás (reinício da coleira).
+    :param data: DataFrame com as colunas 'Time(ms)', 'Date' e 'UTC_Time', na ordem do arquivo.
+    :return: Série com o instante em ms; NaN nas sessões sem nenhuma fixação com data válida.
+    """
+    tempo = data["Time(ms)"].astype(float)
+    utc_ms = instante_utc(data)
+
+    # A diferença entre o relógio do GPS e 'Time(ms)' é constante dentro de uma sessão
+    sessao = (tempo.diff() < 0).cumsum()
+    deslocamento = (utc_ms - tempo).groupby(sessao).transform("median")
+    return tempo + deslocamento
+
+
 class GPS:
     def __init__(self, data=None, data_path=None):
         self.data = None
@@ -31,6 +60,20 @@ class GPS:
             raise ValueError(f"O conjunto de dados deve conter as colunas {required_columns}.")
     
     
+    def load_intervalo(self, historico, coleira, inicio=None, fim=None):
+        """
+        Carrega os dados de GPS de uma coleira a partir do histórico bruto.
+        :param historico: Instância de HistoricoBruto.
+        :param coleira: Identificador da coleira.
+        :param inicio: Instante inicial, inclusivo (ms desde a época, datetime ou texto ISO; UTC). None para sem limite.
+        :param fim: Instante final, inclusivo. None para sem limite.
+        """
+        data = historico.ler_intervalo(coleira, "gps", inicio, fim)
+        if data.empty:
+            raise ValueError(f"Nenhum dado de GPS para a coleira {coleira} no intervalo informado.")
+        self.load_data(data=data)
+    
+    
     def calcular_distancia_total(self):
         """
         Calcula a distância total percorrida com base nas coordenadas GPS.
@@ -0,0 +1,288 @@
+import io
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.gps import instante_utc
+
+
+historico_path = "data/historico"
+
+# Instante absoluto (ms desde a época Unix, UTC) usado como chave de tempo do histórico
+coluna_tempo = "Timestamp(ms)"
+
+
+def _para_ms(instante):
+    """
+    Converte um instante (ms desde a época, datetime ou texto ISO) para ms desde a época, em UTC.
+    Instantes sem fuso horário são considerados UTC.
+    """
+    if instante is None:
+        return None
+    if isinstance(instante, (int, float, np.integer, np.floating)):
+        return float(instante)
+    instante = pd.Timestamp(instante)
+    if instante.tzinfo is None:
+        instante = instante.tz_localize("UTC")
+    return (instante - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(milliseconds=1)
+
+
+class HistoricoBruto:
+    def __init__(self, path=historico_path):
+        """
+        Armazena o histórico bruto por coleira em segmentos colunares ordenados no tempo.
+        Cada anexação grava um novo segmento (.npz) e nunca reescreve os anteriores;
+        um índice SQLite guarda os limites de tempo absoluto de cada segmento.
+        :param path: Diretório raiz do histórico.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(self.path, exist_ok=True)
+        self._conexao = sqlite3.connect(os.path.join(self.path, "indice.sqlite"), check_same_thread=False)
+        self._conexao.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS segmentos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                coleira TEXT NOT NULL,
+                sensor TEXT NOT NULL,
+                t_inicio REAL NOT NULL,
+                t_fim REAL NOT NULL,
+                linhas INTEGER NOT NULL,
+                arquivo TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_segmentos_tempo ON segmentos (coleira, sensor, t_inicio, t_fim);
+
+            -- Bytes de cada CSV bruto já anexados ao histórico
+            CREATE TABLE IF NOT EXISTS ingestao (
+                origem TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL
+            );
+
+            -- Sessão atual (contador de reinícios) e último 'Time(ms)' gravado de cada coleira e sensor
+            CREATE TABLE IF NOT EXISTS sessoes (
+                coleira TEXT NOT NULL,
+                sensor TEXT NOT NULL,
+                sessao INTEGER NOT NULL,
+                ultimo_tempo REAL NOT NULL,
+                PRIMARY KEY (coleira, sensor)
+            );
+
+            -- Diferença entre o relógio do GPS e 'Time(ms)' em cada sessão de cada coleira
+            CREATE TABLE IF NOT EXISTS relogios_sessao (
+                coleira TEXT NOT NULL,
+                sessao INTEGER NOT NULL,
+                deslocamento_ms REAL NOT NULL,
+                PRIMARY KEY (coleira, sessao)
+            );
+            """
+        )
+        self._conexao.commit()
+
+    def _ancorar(self, coleira, sensor, data):
+        """
+        Calcula o instante absoluto de cada linha a partir do relógio do GPS da sua sessão.
+        As sessões são numeradas por coleira e sensor: cada vez que 'Time(ms)' volta para trás
+        (inclusive em relação ao último lote gravado) começa uma nova. O GPS registra o deslocamento
+        de cada sessão com fixação válida; os demais sensores compartilham o 'Time(ms)' da coleira
+        e usam o deslocamento da sessão de mesmo número.
+        :return: Tupla (instantes, sessões); instante NaN nas sessões cujo deslocamento ainda é desconhecido.
+        """
+        tempo = data["Time(ms)"].astype(float)
+
+        estado = self._conexao.execute(
+            "SELECT sessao, ultimo_tempo FROM sessoes WHERE coleira = ? AND sensor = ?", (coleira, sensor)
+        ).fetchone()
+        quebra = tempo.diff() < 0
+        if estado is not None:
+            quebra.iloc[0] = tempo.iloc[0] < estado[1]
+        sessao = (estado[0] if estado is not None else 0) + quebra.cumsum()
+
+        deslocamentos = dict(self._conexao.execute(
+            "SELECT sessao, deslocamento_ms FROM relogios_sessao WHERE coleira = ?", (coleira,)
+        ).fetchall())
+
+        if sensor == "gps" and {"Date", "UTC_Time"}.issubset(data.columns):
+            # O primeiro deslocamento de uma sessão é mantido, pois as linhas já gravadas dependem dele
+            por_sessao = (instante_utc(data) - tempo).groupby(sessao).median().dropna()
+            for numero, deslocamento in por_sessao.items():
+                if int(numero) not in deslocamentos:
+                    deslocamentos[int(numero)] = float(deslocamento)
+                    self._conexao.execute(
+                        "INSERT INTO relogios_sessao (coleira, sessao, deslocamento_ms) VALUES (?, ?, ?)",
+                        (coleira, int(numero), float(deslocamento)),
+                    )
+
+        return tempo + sessao.map(deslocamentos).astype(float), sessao
+
+    def anexar(self, coleira, sensor, data, origem=None, fim_linhas=None):
+        """
+        Anexa um lote de amostras como um novo segmento.
+        O lote é gravado até a primeira linha cuja sessão ainda não tem relógio de GPS conhecido;
+        essa linha e as seguintes não são gravadas e devem ser reenviadas depois.
+        :param coleira: Identificador da coleira (ex.: 'Mimosa').
+        :param sensor: Tipo de sensor ('acelerometro' ou 'gps').
+        :param data: DataFrame com as amostras, na ordem de coleta, contendo 'Time(ms)' (ou já 'Timestamp(ms)').
+        :param origem: Arquivo de origem; com 'fim_linhas', registra na mesma transação até onde ele foi lido.
+        :param fim_linhas: Posição (em bytes) do fim de cada linha de 'data' no arquivo de origem.
+        :return: Número de linhas gravadas, sempre as primeiras do lote.
+        """
+        if not isinstance(data, pd.DataFrame):
+            raise ValueError("Os dados devem ser um DataFrame.")
+        if coluna_tempo not in data.columns and "Time(ms)" not in data.columns:
+            raise ValueError("Os dados precisam conter a coluna 'Time(ms)'.")
+
+        with self._lock:
+            data = data.reset_index(drop=True)
+            if not data.empty and coluna_tempo not in data.columns:
+                data[coluna_tempo], sessao = self._ancorar(coleira, sensor, data)
+
+                # Uma sessão sem relógio conhecido não é gravada com um relógio de outra sessão
+                sem_relogio = data[coluna_tempo].isna().to_numpy()
+                corte = int(np.argmax(sem_relogio)) if sem_relogio.any() else len(data)
+                data = data.iloc[:corte]
+                if corte > 0:
+                    self._conexao.execute(
+                        "INSERT OR REPLACE INTO sessoes (coleira, sensor, sessao, ultimo_tempo) VALUES (?, ?, ?, ?)",
+                        (coleira, sensor, int(sessao.iloc[corte - 1]), float(data["Time(ms)"].iloc[-1])),
+                    )
+
+            gravadas = len(data)
+            if gravadas > 0:
+                data = data.sort_values(coluna_tempo, kind="mergesort").reset_index(drop=True)
+                t_inicio = float(data[coluna_tempo].iloc[0])
+                t_fim = float(data[coluna_tempo].iloc[-1])
+
+                # Colunas de texto viram arrays unicode para não depender de pickle na leitura
+                colunas = {}
+                for coluna in data.columns:
+                    valores = data[coluna].to_numpy()
+                    if valores.dtype == object:
+                        valores = valores.astype(str)
+                    colunas[coluna] = valores
+
+                os.makedirs(os.path.join(self.path, sensor, coleira), exist_ok=True)
+                cursor = self._conexao.execute(
+                    "INSERT INTO segmentos (coleira, sensor, t_inicio, t_fim, linhas, arquivo) VALUES (?, ?, ?, ?, ?, '')",
+                    (coleira, sensor, t_inicio, t_fim, gravadas),
+                )
+                segmento_id = cursor.lastrowid
+                arquivo = os.path.join(sensor, coleira, f"{segmento_id:08d}.npz")
+
+                # Gravar em arquivo temporário e renomear, para nunca indexar um segmento incompleto
+                destino = os.path.join(self.path, arquivo)
+                with open(destino + ".tmp", "wb") as f:
+                    np.savez(f, __colunas__=np.array(list(colunas.keys())), **colunas)
+                os.replace(destino + ".tmp", destino)
+                self._conexao.execute("UPDATE segmentos SET arquivo = ? WHERE id = ?", (arquivo, segmento_id))
+
+                if origem is not None and fim_linhas is not None:
+                    self._conexao.execute(
+                        "INSERT OR REPLACE INTO ingestao (origem, offset) VALUES (?, ?)",
+                        (os.path.abspath(origem), fim_linhas[gravadas - 1]),
+                    )
+            self._conexao.commit()
+
+        return gravadas
+
+    def ingerir_csv(self, coleira, sensor, data_path):
+        """
+        Anexa ao histórico apenas as linhas completas de um CSV bruto que ainda não foram anexadas.
+        Pode ser chamado a cada alteração do arquivo; cada linha entra uma única vez. Linhas de uma
+        sessão ainda sem relógio de GPS ficam no arquivo e são tentadas de novo na próxima chamada.
+        :param coleira: Identificador da coleira.
+        :param sensor: Tipo de sensor ('acelerometro' ou 'gps').
+        :param data_path: Caminho para o arquivo CSV.
+        :return: Número de linhas gravadas.
+        """
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT offset FROM ingestao WHERE origem = ?", (os.path.abspath(data_path),)
+            ).fetchone()
+        offset = linha[0] if linha else 0
+
+        with open(data_path, "rb") as f:
+            cabecalho = f.readline()
+            # Arquivo truncado ou substituído: recomeçar logo após o cabeçalho
+            if offset < len(cabecalho) or offset > os.fstat(f.fileno()).st_size:
+                offset = len(cabecalho)
+            f.seek(offset)
+            novos = f.read()
+
+        # Uma linha ainda sendo escrita fica para a próxima ingestão
+        fim = novos.rfind(b"\n") + 1
+        if fim == 0:
+            return 0
+
+        # Posição no arquivo do fim de cada linha não vazia, na mesma ordem das linhas do DataFrame
+        fim_linhas = []
+        posicao = offset
+        for linha_bruta in novos[:fim].split(b"\n")[:-1]:
+            posicao += len(linha_bruta) + 1
+            if linha_bruta.strip():
+                fim_linhas.append(posicao)
+
+        try:
+            data = pd.read_csv(io.BytesIO(cabecalho + novos[:fim]))
+        except Exception as e:
+            raise ValueError(f"Erro ao carregar dados do caminho {data_path}: {e}")
+        if len(data) != len(fim_linhas):
+            raise ValueError(f"Linhas inesperadas no arquivo {data_path}.")
+        return self.anexar(coleira, sensor, data, origem=data_path, fim_linhas=fim_linhas)
+
+    def segmentos(self, coleira, sensor, inicio=None, fim=None):
+        """
+        Lista os segmentos que se sobrepõem ao intervalo [inicio, fim].
+        :return: Lista de caminhos relativos dos segmentos, em ordem de início.
+        """
+        consulta = "SELECT arquivo FROM segmentos WHERE coleira = ? AND sensor = ? AND arquivo != ''"
+        parametros = [coleira, sensor]
+        if inicio is not None:
+            consulta += " AND t_fim >= ?"
+            parametros.append(_para_ms(inicio))
+        if fim is not None:
+            consulta += " AND t_inicio <= ?"
+            parametros.append(_para_ms(fim))
+        consulta += " ORDER BY t_inicio, id"
+
+        with self._lock:
+            linhas = self._conexao.execute(consulta, parametros).fetchall()
+        return [linha[0] for linha in linhas]
+
+    def ler_intervalo(self, coleira, sensor, inicio=None, fim=None):
+        """
+        Lê as amostras de uma coleira no intervalo [inicio, fim], abrindo apenas os segmentos que o sobrepõem.
+        :param coleira: Identificador da coleira.
+        :param sensor: Tipo de sensor ('acelerometro' ou 'gps').
+        :param inicio: Instante inicial, inclusivo (ms desde a época, datetime ou texto ISO; UTC). None para sem limite.
+        :param fim: Instante final, inclusivo. None para sem limite.
+        :return: DataFrame ordenado pela coluna 'Timestamp(ms)'.
+        """
+        inicio, fim = _para_ms(inicio), _para_ms(fim)
+        partes = []
+        for arquivo in self.segmentos(coleira, sensor, inicio, fim):
+            with np.load(os.path.join(self.path, arquivo)) as segmento:
+                colunas = [str(c) for c in segmento["__colunas__"]]
+                tempo = segmento[coluna_tempo]
+
+                # Segmentos são ordenados, então o recorte é uma busca binária
+                esquerda = 0 if inicio is None else np.searchsorted(tempo, inicio, side="left")
+                direita = len(tempo) if fim is None else np.searchsorted(tempo, fim, side="right")
+                if direita <= esquerda:
+                    continue
+                partes.append(pd.DataFrame({c: segmento[c][esquerda:direita] for c in colunas}))
+
+        if not partes:
+            return pd.DataFrame()
+
+        data = pd.concat(partes, ignore_index=True)
+        # Segmentos anexados fora de ordem podem se sobrepor
+        if len(partes) > 1:
+            data = data.sort_values(coluna_tempo, kind="mergesort").reset_index(drop=True)
+        return data
+
+    def fechar(self):
+        self._conexao.close()
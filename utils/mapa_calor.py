@@ -0,0 +1,175 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.gps import timestamp_absoluto
+
+
+# Grade agregada de todas as coleiras, fora do subdiretório das coleiras para não colidir com nenhum identificador
+arquivo_rebanho = "rebanho.npz"
+coleiras_dir = "coleiras"
+
+# Tamanho da célula no nível 0 (~1,1 m de latitude); cada nível dobra o anterior
+tamanho_base_graus = 1e-5
+niveis = 8
+
+# Grades de animais diferentes atualizam a mesma grade do rebanho
+_lock_grades = threading.Lock()
+
+
+class MapaCalor:
+    def __init__(self, path, permanencia_max_s=60.0):
+        """
+        Acumula a ocupação do pasto em histogramas 2D multirresolução, por animal e para o rebanho.
+        Cada fixação de GPS pesa o tempo até a fixação seguinte, então as grades medem
+        permanência e não apenas número de pontos.
+        :param path: Diretório onde as grades são salvas; o rebanho é a soma das coleiras desse diretório.
+                     Cada coleira fica em 'coleiras/<coleira>.npz' e o rebanho em 'rebanho.npz'.
+        :param permanencia_max_s: Permanência máxima atribuída a uma fixação (em segundos),
+                                  para que falhas de sinal não virem horas paradas num ponto.
+        """
+        self.path = path
+        self.permanencia_max_s = permanencia_max_s
+        os.makedirs(os.path.join(self.path, coleiras_dir), exist_ok=True)
+
+    def _arquivo(self, coleira):
+        if coleira is None:
+            return os.path.join(self.path, arquivo_rebanho)
+        return os.path.join(self.path, coleiras_dir, f"{coleira}.npz")
+
+    def carregar(self, coleira=None):
+        """
+        Carrega a grade de um animal (ou do rebanho).
+        :param coleira: Identificador da coleira; None para o rebanho.
+        :return: Dicionário com as células por nível e a última fixação ainda sem permanência.
+        """
+        grade = {"niveis": {n: (np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)) for n in range(niveis)},
+                 "pendente": None}
+        filepath = self._arquivo(coleira)
+        if not os.path.exists(filepath):
+            return grade
+
+        with np.load(filepath) as arquivo:
+            for n in range(niveis):
+                grade["niveis"][n] = (arquivo[f"ix_{n}"], arquivo[f"iy_{n}"], arquivo[f"peso_{n}"])
+            if "pendente" in arquivo:
+                grade["pendente"] = tuple(float(v) for v in arquivo["pendente"])
+        return grade
+
+    def _salvar(self, coleira, grade):
+        arrays = {}
+        for n, (ix, iy, peso) in grade["niveis"].items():
+            arrays[f"ix_{n}"], arrays[f"iy_{n}"], arrays[f"peso_{n}"] = ix, iy, peso
+        if grade["pendente"] is not None:
+            arrays["pendente"] = np.array(grade["pendente"])
+
+        filepath = self._arquivo(coleira)
+        with open(filepath + ".tmp", "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(filepath + ".tmp", filepath)
+
+    @staticmethod
+    def _acumular(celulas, ix, iy, peso):
+        """
+        Soma novas contribuições às células existentes de um nível.
+        """
+        ix = np.concatenate([celulas[0], ix])
+        iy = np.concatenate([celulas[1], iy])
+        peso = np.concatenate([celulas[2], peso])
+        if len(ix) == 0:
+            return celulas
+        chaves, inverso = np.unique(np.stack([ix, iy], axis=1), axis=0, return_inverse=True)
+        return chaves[:, 0], chaves[:, 1], np.bincount(inverso.ravel(), weights=peso)
+
+    def adicionar(self, coleira, data):
+        """
+        Adiciona às grades da coleira e do rebanho as fixações mais novas que as já acumuladas.
+        A comparação usa o instante absoluto do GPS ('Date'/'UTC_Time'), então reprocessar o mesmo
+        arquivo não conta as fixações duas vezes e um reinício da coleira não descarta dados novos.
+        :param coleira: Identificador da coleira.
+        :param data: DataFrame de GPS com 'Time(ms)', 'Date', 'UTC_Time', 'Latitude' e 'Longitude', na ordem do arquivo.
+        :return: Número de fixações adicionadas.
+        """
+        if not {"Time(ms)", "Date", "UTC_Time", "Latitude", "Longitude"}.issubset(data.columns):
+            raise ValueError("Os dados de GPS devem conter as colunas 'Time(ms)', 'Date', 'UTC_Time', "
+                             "'Latitude' e 'Longitude'.")
+
+        # Fixações de sessões sem data válida não podem ser posicionadas no tempo
+        fixacoes = pd.DataFrame({
+            "Timestamp(ms)": timestamp_absoluto(data),
+            "Latitude": data["Latitude"],
+            "Longitude": data["Longitude"],
+        }).dropna()
+        fixacoes = fixacoes[(fixacoes["Latitude"] != 0) | (fixacoes["Longitude"] != 0)]
+        fixacoes = fixacoes.sort_values("Timestamp(ms)", kind="mergesort")
+
+        with _lock_grades:
+            grade = self.carregar(coleira)
+
+            # A última fixação do lote anterior só ganha permanência agora
+            if grade["pendente"] is not None:
+                t_pendente = grade["pendente"][0]
+                fixacoes = fixacoes[fixacoes["Timestamp(ms)"] > t_pendente]
+                if fixacoes.empty:
+                    return 0
+                anterior = pd.DataFrame([grade["pendente"]], columns=["Timestamp(ms)", "Latitude", "Longitude"])
+                fixacoes = pd.concat([anterior, fixacoes], ignore_index=True)
+                novas = len(fixacoes) - 1
+            else:
+                novas = len(fixacoes)
+
+            if len(fixacoes) < 2:
+                if len(fixacoes) == 1:
+                    grade["pendente"] = tuple(float(v) for v in fixacoes.iloc[-1])
+                    self._salvar(coleira, grade)
+                return novas
+
+            tempo = fixacoes["Timestamp(ms)"].to_numpy(dtype=float)
+            lat = fixacoes["Latitude"].to_numpy(dtype=float)[:-1]
+            lon = fixacoes["Longitude"].to_numpy(dtype=float)[:-1]
+            peso = np.clip(np.diff(tempo) / 1000.0, 0, self.permanencia_max_s)
+
+            grade_rebanho = self.carregar()
+            for n in range(niveis):
+                tamanho = tamanho_base_graus * 2 ** n
+                ix = np.floor(lon / tamanho).astype(np.int64)
+                iy = np.floor(lat / tamanho).astype(np.int64)
+                grade["niveis"][n] = self._acumular(grade["niveis"][n], ix, iy, peso)
+                grade_rebanho["niveis"][n] = self._acumular(grade_rebanho["niveis"][n], ix, iy, peso)
+
+            grade["pendente"] = tuple(float(v) for v in fixacoes.iloc[-1])
+            self._salvar(coleira, grade)
+            self._salvar(None, grade_rebanho)
+
+        return novas
+
+    def payload(self, coleira=None, max_celulas=2000):
+        """
+        Monta a grade compacta usada pelo mapa, no nível mais fino que caiba em 'max_celulas'.
+        O tamanho do payload depende da área ocupada, não do período acumulado.
+        :param coleira: Identificador da coleira; None para o rebanho.
+        :param max_celulas: Número máximo de células enviadas ao navegador.
+        :return: Dicionário com 'tamanho_graus', 'peso_max' e 'celulas' ([lat, lng, peso] do canto inferior
+                 esquerdo de cada célula, peso normalizado em 0-1), ou None se não houver dados.
+        """
+        grade = self.carregar(coleira)
+        for n in range(niveis):
+            ix, iy, peso = grade["niveis"][n]
+            if len(peso) <= max_celulas or n == niveis - 1:
+                break
+        if len(peso) == 0:
+            return None
+
+        tamanho = tamanho_base_graus * 2 ** n
+        peso_max = float(peso.max())
+        return {
+            "nivel": n,
+            "tamanho_graus": tamanho,
+            "peso_max": peso_max,
+            "celulas": [
+                [round(y * tamanho, 7), round(x * tamanho, 7), round(p / peso_max, 3)]
+                for x, y, p in zip(ix.tolist(), iy.tolist(), peso.tolist())
+            ],
+        }
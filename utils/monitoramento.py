@@ -0,0 +1,291 @@
+import os
+import re
+import queue
+import threading
+import time
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from utils.historico import HistoricoBruto
+from utils.processamento import Processamento, raw_path, processed_path
+
+
+# Arquivos brutos seguem o padrão '<sensor>_<coleira>.csv' (ex.: 'gps_Mimosa.csv')
+padrao_arquivo_bruto = re.compile(r"^(acelerometro|gps)_(.+)\.csv$")
+
+# Coleira cujos resultados vão direto para 'data/processed', lido pelo dashboard
+coleira_padrao = "example"
+
+
+class _EventosRaw(FileSystemEventHandler):
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.monitor.arquivo_alterado(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.monitor.arquivo_alterado(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.monitor.arquivo_alterado(event.dest_path)
+
+
+class MonitorPipeline:
+    def __init__(self, raw_path=raw_path, output_path=processed_path, debounce_s=2.0, max_espera_s=10.0,
+                 workers=2, tamanho_fila=100, ao_concluir=None, historico=None):
+        """
+        Observa 'data/raw' e reprocessa as coleiras cujos arquivos foram criados ou alterados.
+        :param raw_path: Diretório com os CSVs brutos.
+        :param output_path: Diretório base dos dados processados.
+        :param debounce_s: Tempo sem novas escritas antes de enfileirar a coleira (em segundos).
+        :param max_espera_s: Tempo máximo desde a primeira escrita pendente até enfileirar a coleira (em segundos),
+                             mesmo que as escritas continuem chegando.
+        :param workers: Número de threads que executam o Processamento.
+        :param tamanho_fila: Capacidade máxima da fila de coleiras pendentes.
+        :param ao_concluir: Função opcional chamada como ao_concluir(coleira, inicio, fim, erro) ao fim de cada job.
+        :param historico: HistoricoBruto opcional; as linhas novas dos CSVs são anexadas a ele antes do processamento.
+        """
+        self.raw_path = raw_path
+        self.output_path = output_path
+        self.debounce_s = debounce_s
+        self.max_espera_s = max_espera_s
+        self.n_workers = workers
+        self.ao_concluir = ao_concluir
+        self.historico = historico
+
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self._lock = threading.Lock()
+        self._condicao = threading.Condition(self._lock)
+        self._prazos = {}
+        self._prontas = []
+        self._primeiro_evento = {}
+        self._na_fila = set()
+        self._locks_coleira = {}
+        self._workers = []
+        self._threads = []
+        self._observer = None
+        self._parando = threading.Event()
+
+        self._em_execucao = 0
+        self._processados = 0
+        self._falhas = 0
+        self._atraso_ultimo = 0.0
+        self._atraso_max = 0.0
+        self._duracao_ultima = 0.0
+        self._duracao_total = 0.0
+
+    def destino(self, coleira):
+        """
+        Diretório de saída de uma coleira.
+        """
+        if coleira == coleira_padrao:
+            return self.output_path
+        return os.path.join(self.output_path, coleira)
+
+    def arquivo_alterado(self, path):
+        """
+        Registra uma escrita em um arquivo bruto e (re)arma o debounce da coleira correspondente,
+        sem ultrapassar 'max_espera_s' desde a primeira escrita ainda não processada.
+        """
+        correspondencia = padrao_arquivo_bruto.match(os.path.basename(path))
+        if correspondencia is None:
+            return
+        coleira = correspondencia.group(2)
+
+        with self._condicao:
+            agora = time.monotonic()
+            primeiro = self._primeiro_evento.setdefault(coleira, agora)
+            # Uma coleira já pronta aguardando vaga na fila lerá os arquivos mais recentes
+            if coleira not in self._prontas:
+                # Uma coleira que escreve sem parar ainda é processada a cada 'max_espera_s'
+                self._prazos[coleira] = min(agora + self.debounce_s, primeiro + self.max_espera_s)
+            self._condicao.notify()
+
+    def _agendador(self):
+        """
+        Única thread de debounce: move para a fila as coleiras cujo prazo venceu.
+        Com a fila cheia, as coleiras continuam pendentes (e contadas nas métricas) em vez de bloquear.
+        """
+        with self._condicao:
+            while not self._parando.is_set():
+                agora = time.monotonic()
+                for coleira, prazo in list(self._prazos.items()):
+                    if prazo <= agora:
+                        del self._prazos[coleira]
+                        self._prontas.append(coleira)
+
+                while self._prontas:
+                    coleira = self._prontas[0]
+                    # Uma coleira já na fila será processada com os arquivos mais recentes
+                    if coleira not in self._na_fila:
+                        try:
+                            self.fila.put_nowait((coleira, self._primeiro_evento[coleira]))
+                        except queue.Full:
+                            break
+                        self._na_fila.add(coleira)
+                    self._prontas.pop(0)
+                    self._primeiro_evento.pop(coleira, None)
+
+                espera = min(self._prazos.values(), default=agora + 1.0) - agora
+                if self._prontas:
+                    # Os workers avisam ao liberar vaga; o limite cobre avisos perdidos
+                    espera = min(espera, 0.5)
+                self._condicao.wait(timeout=max(espera, 0.0))
+
+    def _registrar_metricas(self, intervalo_s):
+        while not self._parando.wait(intervalo_s):
+            print(self.metricas())
+
+    def _worker(self):
+        while True:
+            item = self.fila.get()
+            if item is None:
+                self.fila.task_done()
+                return
+            coleira, t_evento = item
+            with self._condicao:
+                self._na_fila.discard(coleira)
+                lock_coleira = self._locks_coleira.setdefault(coleira, threading.Lock())
+                self._condicao.notify()
+            try:
+                with lock_coleira:
+                    self._executar(coleira, t_evento)
+            finally:
+                self.fila.task_done()
+
+    def _executar(self, coleira, t_evento):
+        acelerometro_path = os.path.join(self.raw_path, f"acelerometro_{coleira}.csv")
+        gps_path = os.path.join(self.raw_path, f"gps_{coleira}.csv")
+        if not (os.path.exists(acelerometro_path) and os.path.exists(gps_path)):
+            return
+
+        inicio = time.monotonic()
+        with self._lock:
+            self._em_execucao += 1
+            self._atraso_ultimo = inicio - t_evento
+            self._atraso_max = max(self._atraso_max, self._atraso_ultimo)
+
+        erro = None
+        try:
+            if self.historico is not None:
+                # GPS primeiro, para o acelerômetro usar o relógio da sessão atual
+                self.historico.ingerir_csv(coleira, "gps", gps_path)
+                self.historico.ingerir_csv(coleira, "acelerometro", acelerometro_path)
+            # Todas as coleiras somam na mesma grade do rebanho, sob o diretório base do monitor
+            processador = Processamento(acelerometro_path, gps_path, output_path=self.destino(coleira), coleira=coleira,
+                                        mapa_calor_path=os.path.join(self.output_path, "mapa_calor"))
+            processador.process()
+        except Exception as e:
+            erro = e
+            print(f"Erro ao processar a coleira {coleira}: {e}")
+        fim = time.monotonic()
+
+        with self._lock:
+            self._em_execucao -= 1
+            self._duracao_ultima = fim - inicio
+            if erro is None:
+                self._processados += 1
+                self._duracao_total += self._duracao_ultima
+            else:
+                self._falhas += 1
+
+        if self.ao_concluir is not None:
+            try:
+                self.ao_concluir(coleira, inicio, fim, erro)
+            except Exception as e:
+                print(f"Erro no retorno de conclusão da coleira {coleira}: {e}")
+
+    def metricas(self):
+        """
+        Retorna o estado atual do pipeline.
+        :return: Dicionário com profundidade da fila, atrasos (s) e duração dos jobs (s).
+        """
+        agora = time.monotonic()
+        with self._lock:
+            pendentes = list(self._primeiro_evento.values())
+            return {
+                "fila": self.fila.qsize(),
+                "aguardando_debounce": len(self._prazos),
+                "aguardando_fila": len(self._prontas),
+                "em_execucao": self._em_execucao,
+                "processados": self._processados,
+                "falhas": self._falhas,
+                "atraso_ultimo_s": self._atraso_ultimo,
+                "atraso_max_s": self._atraso_max,
+                "atraso_pendente_s": agora - min(pendentes) if pendentes else 0.0,
+                "duracao_ultima_s": self._duracao_ultima,
+                "duracao_media_s": self._duracao_total / self._processados if self._processados else 0.0,
+            }
+
+    def iniciar(self, varredura_inicial=True, intervalo_metricas_s=None):
+        """
+        Inicia os workers, o agendador e o observador de arquivos.
+        :param varredura_inicial: Se True, enfileira as coleiras já presentes em 'data/raw'.
+        :param intervalo_metricas_s: Se informado, exibe as métricas a cada intervalo (em segundos).
+        """
+        self._parando.clear()
+        self._threads = [threading.Thread(target=self._agendador, daemon=True)]
+        if intervalo_metricas_s:
+            self._threads.append(threading.Thread(target=self._registrar_metricas, args=(intervalo_metricas_s,), daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+        for _ in range(self.n_workers):
+            worker = threading.Thread(target=self._worker, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+        os.makedirs(self.raw_path, exist_ok=True)
+        self._observer = Observer()
+        self._observer.schedule(_EventosRaw(self), self.raw_path, recursive=False)
+        self._observer.start()
+
+        if varredura_inicial:
+            for filename in sorted(os.listdir(self.raw_path)):
+                self.arquivo_alterado(os.path.join(self.raw_path, filename))
+
+    def parar(self):
+        """
+        Para o observador e aguarda os workers terminarem os jobs em andamento.
+        """
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        with self._condicao:
+            self._parando.set()
+            self._condicao.notify()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        with self._lock:
+            self._prazos.clear()
+            self._prontas.clear()
+            self._primeiro_evento.clear()
+        for _ in self._workers:
+            self.fila.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+
+def main(intervalo_s=10):
+    """
+    Executa o monitor até ser interrompido, exibindo as métricas periodicamente.
+    """
+    monitor = MonitorPipeline(historico=HistoricoBruto())
+    monitor.iniciar(intervalo_metricas_s=intervalo_s)
+    print(f"Monitorando {monitor.raw_path}...")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        monitor.parar()
+
+
+if __name__ == "__main__":
+    main()
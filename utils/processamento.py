@@ -1,27 +1,100 @@
 from utils.acelerometro import Acelerometro
 from utils.gps import GPS
+from utils.escrita import EscritorGeracoes, geracao_atual, caminho_geracao
+from utils.mapa_calor import MapaCalor
 
 import pandas as pd
 import os
-import numpy as np
+import json
 
 
+raw_path = "data/raw"
 acelerometro_raw_path = "data/raw/acelerometro_example.csv"
 GPS_raw_path = "data/raw/gps_example.csv"
 
 processed_path = "data/processed"
 
+arquivos_json = ["passos.json", "distancia_total.json", "movimentos_descendentes.json", "tempo_movimento.json", "tempo_comendo.json", "mapa_calor.json"]
+arquivos_csv = ["distancia_por_tempo.csv", "posicao_tempo.csv"]
+
+
+def _ler_arquivos(path, nomes):
+    """
+    Lê os arquivos processados informados. Um arquivo ausente levanta FileNotFoundError.
+    """
+    data = {}
+    for filename in nomes:
+        filepath = os.path.join(path, filename)
+        if filename.endswith(".json"):
+            with open(filepath, "r") as f:
+                data[filename] = json.load(f)
+        else:
+            data[filename] = pd.read_csv(filepath)
+    return data
+
+
+def carregar_processados(path=processed_path, geracao=None, tentativas=5):
+    """
+    Carrega os dados processados salvos em um diretório.
+    Todos os arquivos são lidos da mesma geração, então a leitura nunca mistura execuções.
+    :param path: Diretório base dos arquivos processados.
+    :param geracao: Geração a ser lida. Se None, usa a geração atual; sem gerações publicadas,
+                    lê os arquivos soltos em 'path'.
+    :param tentativas: Quantas vezes reler 'ATUAL' se a geração for removida durante a leitura.
+    :return: Um dicionário com os dados carregados, indexado pelo nome do arquivo,
+             e a chave 'geracao' com a geração lida.
+    """
+    esperados = arquivos_json + arquivos_csv
+
+    for _ in range(tentativas):
+        atual = geracao if geracao is not None else geracao_atual(path)
+        if atual is None:
+            data = _ler_arquivos(path, [f for f in esperados if os.path.exists(os.path.join(path, f))])
+            data["geracao"] = None
+            return data
+
+        # Toda geração publicada contém todos os arquivos esperados: se algum faltar,
+        # a geração está sendo removida e a leitura recomeça pela geração atual
+        try:
+            data = _ler_arquivos(caminho_geracao(path, atual), esperados)
+        except FileNotFoundError:
+            if geracao is not None:
+                raise
+            continue
+        data["geracao"] = atual
+        return data
+
+    raise RuntimeError(f"Não foi possível ler uma geração consistente de {path} após {tentativas} tentativas.")
+
 
 class Processamento():
-    def __init__(self) -> None:
-        data_acelerometro = pd.read_csv(acelerometro_raw_path)
-        data_gps = pd.read_csv(GPS_raw_path)
+    def __init__(self, acelerometro_path=acelerometro_raw_path, gps_path=GPS_raw_path, output_path=processed_path,
+                 coleira="example", mapa_calor_path=None) -> None:
+        """
+        Carrega os dados brutos de uma coleira.
+        :param acelerometro_path: Caminho para o CSV do acelerômetro.
+        :param gps_path: Caminho para o CSV do GPS.
+        :param output_path: Diretório onde os dados processados serão salvos.
+        :param coleira: Identificador da coleira, usado nas grades do mapa de calor.
+        :param mapa_calor_path: Diretório das grades do mapa de calor, compartilhado pelo rebanho.
+                                Padrão: 'mapa_calor' dentro de 'output_path'.
+        """
+        data_acelerometro = pd.read_csv(acelerometro_path)
+        data_gps = pd.read_csv(gps_path)
+        self.output_path = output_path
+        self.escritor = EscritorGeracoes(output_path)
+        self.coleira = coleira
+        self.mapa_calor = MapaCalor(mapa_calor_path or os.path.join(output_path, "mapa_calor"))
         
         self.AC = Acelerometro(data=data_acelerometro)
         self.GPS = GPS(data=data_gps)
 
     
     def process(self):
+        """
+        Calcula as métricas da coleira e publica os resultados.
+        :return: Identificador da geração publicada.
+        """
         passos = self.AC.contar_passos()
         tempo_comendo = self.AC.calcular_tempo_comendo()
         print('tempo_comendo ', tempo_comendo)
@@ -30,42 +103,17 @@ class Processamento():
         abaixou_cabeca_total = self.AC.detectar_movimentos_descendentes_y()
         posicao_tempo = self.GPS.data[['Latitude', 'Longitude', 'UTC_Time']]
         tempo_em_movimento, tempo_parado = self.GPS.calcular_tempo_movimento()
+        self.mapa_calor.adicionar(self.coleira, self.GPS.data)
         
-        os.makedirs(processed_path, exist_ok=True)
-
-        # Salvar os dados processados
-        self.salvar_dados("tempo_comendo.json", {"tempo_comendo": tempo_comendo})
-        self.salvar_dados("passos.json", {"passos": passos})
-        self.salvar_dados("distancia_total.json", {"distancia_total_m": distancia_total})
-        self.salvar_dados("distancia_por_tempo.csv", distancia_por_tempo)
-        self.salvar_dados("movimentos_descendentes.json", {"movimentos_descendentes": abaixou_cabeca_total})
-        self.salvar_dados("posicao_tempo.csv", posicao_tempo)
-        self.salvar_dados(
-            "tempo_movimento.json",
-            {"tempo_em_movimento_s": tempo_em_movimento, "tempo_parado_s": tempo_parado}
-        )
-        
-        
-    def salvar_dados(self, filename, data):
-        """
-        Salva os dados processados em arquivos.
-        :param filename: Nome do arquivo a ser salvo (com extensão .csv ou .json).
-        :param data: Dados a serem salvos. Pode ser um DataFrame, dicionário ou lista.
-        """
-        filepath = os.path.join(processed_path, filename)
-        
-        # Verificar extensão e salvar de acordo
-        if filename.endswith(".csv") and isinstance(data, pd.DataFrame):
-            data.to_csv(filepath, index=False)
-        elif filename.endswith(".json") and isinstance(data, dict):
-            # Converter valores para tipos JSON serializáveis
-            serializable_data = {
-                k: (v.item() if isinstance(v, (np.int64, np.float64)) else v)
-                for k, v in data.items()
-            }
-            with open(filepath, "w") as f:
-                import json
-                json.dump(serializable_data, f, indent=4)
-        else:
-            raise ValueError(f"Formato de arquivo ou tipo de dados não suportado para {filename}")
-
+        # Publicar todos os resultados como uma única geração
+        saidas = {
+            "tempo_comendo.json": {"tempo_comendo": tempo_comendo},
+            "passos.json": {"passos": passos},
+            "distancia_total.json": {"distancia_total_m": distancia_total},
+            "distancia_por_tempo.csv": distancia_por_tempo,
+            "movimentos_descendentes.json": {"movimentos_descendentes": abaixou_cabeca_total},
+            "posicao_tempo.csv": posicao_tempo,
+            "tempo_movimento.json": {"tempo_em_movimento_s": tempo_em_movimento, "tempo_parado_s": tempo_parado},
+            "mapa_calor.json": {"animal": self.mapa_calor.payload(self.coleira), "rebanho": self.mapa_calor.payload()},
+        }
+        return self.escritor.publicar(saidas)
@@ -0,0 +1,358 @@
+import argparse
+import os
+import queue
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.monitoramento import MonitorPipeline, padrao_arquivo_bruto
+from utils.processamento import acelerometro_raw_path, GPS_raw_path, carregar_processados
+
+
+sensores = {"acelerometro": acelerometro_raw_path, "gps": GPS_raw_path}
+
+
+def _anexar_csv(filepath, texto, colunas, lock):
+    """
+    Anexa linhas CSV a um arquivo bruto, escrevendo o cabeçalho se o arquivo ainda não existir.
+    """
+    with lock:
+        novo = not os.path.exists(filepath)
+        with open(filepath, "a") as f:
+            f.write((",".join(colunas) + "\n" if novo else "") + texto)
+
+
+class ReceptorSocket:
+    def __init__(self, raw_path, endereco=("127.0.0.1", 9999), ao_receber=None):
+        """
+        Recebe amostras por TCP, uma por linha no formato '<sensor>,<coleira>,<linha CSV>',
+        e as anexa aos arquivos brutos '<sensor>_<coleira>.csv'.
+        :param raw_path: Diretório onde os CSVs brutos serão gravados.
+        :param endereco: Tupla (host, porta) onde o receptor escuta.
+        :param ao_receber: Função opcional chamada como ao_receber(coleira, instante) após gravar cada amostra.
+        """
+        self.raw_path = raw_path
+        self.ao_receber = ao_receber
+        self.colunas = {sensor: list(pd.read_csv(path, nrows=0).columns) for sensor, path in sensores.items()}
+        self.linhas_invalidas = 0
+        self._locks = {}
+        self._lock = threading.Lock()
+
+        receptor = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for linha in self.rfile:
+                    receptor.receber(linha)
+
+        self._servidor = socketserver.ThreadingTCPServer(endereco, _Handler)
+        self._servidor.daemon_threads = True
+        self.endereco = self._servidor.server_address
+        self._thread = None
+
+    def receber(self, linha):
+        """
+        Grava uma amostra recebida. Linhas malformadas são descartadas e contadas em 'linhas_invalidas'.
+        :param linha: Linha recebida, em bytes ou texto.
+        """
+        try:
+            if isinstance(linha, bytes):
+                linha = linha.decode("utf-8")
+            sensor, coleira, amostra = linha.split(",", 2)
+            filename = f"{sensor}_{coleira}.csv"
+            # O nome vira caminho de arquivo: só aceitar nomes simples no padrão dos brutos
+            if (padrao_arquivo_bruto.match(filename) is None or os.path.basename(filename) != filename
+                    or coleira.startswith(".") or not amostra.strip()):
+                raise ValueError(f"Linha inválida: {linha!r}")
+        except ValueError:
+            with self._lock:
+                self.linhas_invalidas += 1
+            return
+
+        filepath = os.path.join(self.raw_path, filename)
+        with self._lock:
+            lock = self._locks.setdefault(filepath, threading.Lock())
+        _anexar_csv(filepath, amostra if amostra.endswith("\n") else amostra + "\n", self.colunas[sensor], lock)
+        if self.ao_receber is not None:
+            self.ao_receber(coleira, time.monotonic())
+
+    def iniciar(self):
+        os.makedirs(self.raw_path, exist_ok=True)
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class SimuladorColeiras:
+    def __init__(self, n_coleiras=10, aceleracao=100.0, jitter_ms=50.0, deslocamento_max_ms=60000,
+                 destino="diretorio", raw_path=None, endereco=("127.0.0.1", 9999), semente=None):
+        """
+        Sintetiza N coleiras a partir dos arquivos de exemplo e as reproduz em tempo acelerado.
+        :param n_coleiras: Número de coleiras simuladas.
+        :param aceleracao: Fator de aceleração da reprodução (1 = tempo real, até 1000).
+        :param jitter_ms: Desvio padrão do ruído aplicado aos timestamps (em ms).
+        :param deslocamento_max_ms: Deslocamento máximo aleatório do início de cada coleira (em ms).
+        :param destino: 'diretorio' para escrever em 'data/raw' ou 'socket' para enviar a um ReceptorSocket.
+        :param raw_path: Diretório dos CSVs brutos. Se None, usa um diretório temporário removido por limpar().
+        :param endereco: Tupla (host, porta) do receptor (modo 'socket').
+        :param semente: Semente do gerador aleatório, para reprodutibilidade.
+        """
+        if not 1 <= aceleracao <= 1000:
+            raise ValueError("A aceleração deve estar entre 1 e 1000.")
+        if destino not in ("diretorio", "socket"):
+            raise ValueError("O destino deve ser 'diretorio' ou 'socket'.")
+
+        self.aceleracao = aceleracao
+        self.destino = destino
+        self._raw_temporario = raw_path is None
+        self.raw_path = tempfile.mkdtemp(prefix="straca-sim-raw-") if raw_path is None else raw_path
+        self.endereco = endereco
+        self.coleiras = [f"sim{i:03d}" for i in range(n_coleiras)]
+
+        rng = np.random.default_rng(semente)
+        exemplos = {sensor: pd.read_csv(path) for sensor, path in sensores.items()}
+        self.colunas = {sensor: list(data.columns) for sensor, data in exemplos.items()}
+
+        # Cada fluxo (coleira, sensor) guarda seus tempos e as linhas já formatadas em CSV
+        self.fluxos = []
+        for coleira in self.coleiras:
+            deslocamento = rng.uniform(0, deslocamento_max_ms)
+            deslocamento_lat, deslocamento_lon = rng.uniform(-0.001, 0.001, size=2)
+            for sensor, exemplo in exemplos.items():
+                data = exemplo.copy()
+                data["Time(ms)"] = (data["Time(ms)"] + deslocamento
+                                    + rng.normal(0, jitter_ms, size=len(data))).round().astype(np.int64)
+                if sensor == "gps":
+                    data["Latitude"] = (data["Latitude"] + deslocamento_lat).round(6)
+                    data["Longitude"] = (data["Longitude"] + deslocamento_lon).round(6)
+                data = data.sort_values("Time(ms)").reset_index(drop=True)
+                linhas = data.to_csv(index=False, header=False).splitlines(keepends=True)
+                self.fluxos.append({
+                    "coleira": coleira,
+                    "sensor": sensor,
+                    "tempos": data["Time(ms)"].to_numpy(),
+                    "linhas": linhas,
+                    "posicao": 0,
+                })
+
+        self.t_inicial = min(fluxo["tempos"][0] for fluxo in self.fluxos)
+        self.t_final = max(fluxo["tempos"][-1] for fluxo in self.fluxos)
+        self.amostras_total = sum(len(fluxo["linhas"]) for fluxo in self.fluxos)
+
+    def reproduzir(self, ao_emitir=None, passo_s=0.05):
+        """
+        Reproduz todas as amostras respeitando a aceleração configurada.
+        :param ao_emitir: Função opcional chamada como ao_emitir(coleira, instante, amostras) após cada lote emitido.
+        :param passo_s: Intervalo entre lotes (em segundos de relógio).
+        :return: Número de amostras emitidas.
+        """
+        locks = {}
+        conexao = None
+        self._remover_brutos()
+        if self.destino == "socket":
+            conexao = socket.create_connection(self.endereco)
+        else:
+            os.makedirs(self.raw_path, exist_ok=True)
+
+        emitidas = 0
+        inicio = time.monotonic()
+        try:
+            while emitidas < self.amostras_total:
+                relogio = self.t_inicial + (time.monotonic() - inicio) * self.aceleracao * 1000
+                for fluxo in self.fluxos:
+                    fim = int(np.searchsorted(fluxo["tempos"], relogio, side="right"))
+                    if fim <= fluxo["posicao"]:
+                        continue
+                    lote = fluxo["linhas"][fluxo["posicao"]:fim]
+                    fluxo["posicao"] = fim
+                    emitidas += len(lote)
+
+                    if conexao is not None:
+                        prefixo = f"{fluxo['sensor']},{fluxo['coleira']},"
+                        conexao.sendall("".join(prefixo + linha for linha in lote).encode("utf-8"))
+                    else:
+                        filepath = os.path.join(self.raw_path, f"{fluxo['sensor']}_{fluxo['coleira']}.csv")
+                        lock = locks.setdefault(filepath, threading.Lock())
+                        _anexar_csv(filepath, "".join(lote), self.colunas[fluxo["sensor"]], lock)
+
+                    if ao_emitir is not None:
+                        ao_emitir(fluxo["coleira"], time.monotonic(), len(lote))
+                time.sleep(passo_s)
+        finally:
+            if conexao is not None:
+                conexao.close()
+
+        return emitidas
+
+    def _remover_brutos(self):
+        """
+        Apaga os CSVs das coleiras simuladas deixados por execuções anteriores, para não misturar execuções.
+        """
+        for fluxo in self.fluxos:
+            filepath = os.path.join(self.raw_path, f"{fluxo['sensor']}_{fluxo['coleira']}.csv")
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            fluxo["posicao"] = 0
+
+    def limpar(self):
+        """
+        Remove o diretório bruto temporário, se o simulador criou um.
+        """
+        if self._raw_temporario:
+            shutil.rmtree(self.raw_path, ignore_errors=True)
+
+
+def _percentis(valores):
+    if not valores:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(max(valores))}
+
+
+def teste_carga(simulador, output_path=None, workers=2, debounce_s=0.5, tempo_limite_s=300):
+    """
+    Executa um teste de carga ponta a ponta: reprodução -> MonitorPipeline -> leitura do dashboard.
+    :param simulador: Instância de SimuladorColeiras.
+    :param output_path: Diretório base dos dados processados. Se None, usa um diretório temporário
+                        removido ao final.
+    :param workers: Número de workers do MonitorPipeline.
+    :param debounce_s: Debounce do MonitorPipeline (em segundos).
+    :param tempo_limite_s: Tempo máximo de espera para o pipeline esvaziar após a reprodução.
+    :return: Dicionário com vazão e latências por amostra (em segundos), medidas da mesma forma nos dois destinos.
+    """
+    processed_temporario = output_path is None
+    if processed_temporario:
+        output_path = tempfile.mkdtemp(prefix="straca-sim-processed-")
+
+    lock = threading.Lock()
+    pendentes = {coleira: [] for coleira in simulador.coleiras}
+    concluidos = queue.Queue()
+    latencias_processado = []
+    latencias_dashboard = []
+
+    # Cada entrada é (instante em que ficou disponível em disco, número de amostras)
+    def ao_emitir(coleira, instante, amostras=1):
+        with lock:
+            pendentes[coleira].append((instante, amostras))
+
+    def ao_concluir(coleira, inicio, fim, erro):
+        if erro is not None or coleira not in pendentes:
+            return
+        # Um job cobre todas as amostras escritas antes de ele começar a ler os arquivos
+        with lock:
+            cobertos = [(t, n) for t, n in pendentes[coleira] if t <= inicio]
+            pendentes[coleira] = [(t, n) for t, n in pendentes[coleira] if t > inicio]
+        latencias_processado.extend(fim - t for t, n in cobertos for _ in range(n))
+        if cobertos:
+            concluidos.put((coleira, cobertos))
+
+    # No modo socket, a amostra só conta como disponível quando o receptor a grava no disco
+    receptor = None
+    if simulador.destino == "socket":
+        receptor = ReceptorSocket(simulador.raw_path, simulador.endereco, ao_receber=ao_emitir)
+        simulador.endereco = receptor.endereco
+        receptor.iniciar()
+
+    monitor = MonitorPipeline(simulador.raw_path, output_path, debounce_s=debounce_s,
+                              workers=workers, ao_concluir=ao_concluir)
+    monitor.iniciar(varredura_inicial=False)
+
+    parar_medicao = threading.Event()
+
+    def medir_dashboard():
+        # Leitura feita fora dos workers, como faria o dashboard
+        while not (parar_medicao.is_set() and concluidos.empty()):
+            try:
+                coleira, cobertos = concluidos.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            carregar_processados(monitor.destino(coleira))
+            carregado = time.monotonic()
+            latencias_dashboard.extend(carregado - t for t, n in cobertos for _ in range(n))
+
+    medidor = threading.Thread(target=medir_dashboard, daemon=True)
+    medidor.start()
+
+    inicio = time.monotonic()
+    try:
+        emitidas = simulador.reproduzir(ao_emitir=ao_emitir if receptor is None else None)
+        fim_reproducao = time.monotonic()
+
+        limite = fim_reproducao + tempo_limite_s
+        while time.monotonic() < limite:
+            with lock:
+                restantes = sum(n for v in pendentes.values() for _, n in v)
+            if restantes == 0:
+                break
+            time.sleep(0.1)
+        fim = time.monotonic()
+    finally:
+        monitor.parar()
+        if receptor is not None:
+            receptor.parar()
+        parar_medicao.set()
+        medidor.join()
+        if processed_temporario:
+            shutil.rmtree(output_path, ignore_errors=True)
+
+    with lock:
+        nao_processadas = sum(n for v in pendentes.values() for _, n in v)
+
+    return {
+        "coleiras": len(simulador.coleiras),
+        "aceleracao": simulador.aceleracao,
+        "amostras": emitidas,
+        "duracao_reproducao_s": fim_reproducao - inicio,
+        "duracao_total_s": fim - inicio,
+        "vazao_amostras_s": emitidas / (fim - inicio),
+        "amostras_nao_processadas": nao_processadas,
+        "linhas_invalidas": receptor.linhas_invalidas if receptor is not None else 0,
+        "latencia_processado_s": _percentis(latencias_processado),
+        "latencia_dashboard_s": _percentis(latencias_dashboard),
+        "monitor": monitor.metricas(),
+    }
+
+
+def main():
+    """
+    Executa o teste de carga pela linha de comando e exibe o relatório.
+    """
+    parser = argparse.ArgumentParser(description="Simulador de coleiras e teste de carga do pipeline.")
+    parser.add_argument("--coleiras", type=int, default=10)
+    parser.add_argument("--aceleracao", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--destino", choices=["diretorio", "socket"], default="diretorio")
+    parser.add_argument("--porta", type=int, default=9999)
+    parser.add_argument("--raw", default=None, help="Diretório bruto (padrão: temporário, removido ao final).")
+    parser.add_argument("--processed", default=None, help="Diretório processado (padrão: temporário, removido ao final).")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--semente", type=int, default=None)
+    args = parser.parse_args()
+
+    simulador = SimuladorColeiras(
+        n_coleiras=args.coleiras, aceleracao=args.aceleracao, jitter_ms=args.jitter_ms,
+        destino=args.destino, raw_path=args.raw, endereco=("127.0.0.1", args.porta), semente=args.semente,
+    )
+    print(f"Reproduzindo {simulador.amostras_total} amostras de {args.coleiras} coleiras a {args.aceleracao}x...")
+    try:
+        relatorio = teste_carga(simulador, output_path=args.processed, workers=args.workers)
+    finally:
+        simulador.limpar()
+
+    for chave, valor in relatorio.items():
+        print(f"{chave}: {valor}")
+
+
+if __name__ == "__main__":
+    main()